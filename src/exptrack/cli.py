@@ -1,32 +1,30 @@
 from __future__ import annotations
 
-import argparse
-import json
 import sys
 
-from exptrack.db import ExperimentDB
-from exptrack.metrics import export_series_to_csv, simple_moving_average
+# Heavy stdlib and sibling modules (json, argparse, sqlite3 via exptrack.db,
+# csv via exptrack.metrics) are imported lazily inside the functions that
+# need them so 'exptrack --help' pays only for what it uses.
 
 
-def cmd_init(args) -> int:
-    db = ExperimentDB(args.db)
+def cmd_init(db, args) -> int:
     db.init()
     print(f"[OK] Initialized database: {args.db}")
     return 0
 
 
-def cmd_run_create(args) -> int:
-    db = ExperimentDB(args.db)
-    db.init()
+def cmd_run_create(db, args) -> int:
+    import json
+
+    db.ensure_schema()
     config = json.loads(args.config) if args.config else {}
     run_id = db.create_run(name=args.name, tags=args.tags or "", notes=args.notes or "", config=config)
     print(f"[OK] Created run id={run_id} name={args.name}")
     return 0
 
 
-def cmd_run_list(args) -> int:
-    db = ExperimentDB(args.db)
-    db.init()
+def cmd_run_list(db, args) -> int:
+    db.ensure_schema()
     runs = db.list_runs(limit=args.limit)
     if not runs:
         print("(no runs)")
@@ -36,9 +34,8 @@ def cmd_run_list(args) -> int:
     return 0
 
 
-def cmd_run_show(args) -> int:
-    db = ExperimentDB(args.db)
-    db.init()
+def cmd_run_show(db, args) -> int:
+    db.ensure_schema()
     r = db.get_run(args.run)
     if not r:
         print("[ERR] Run not found")
@@ -54,47 +51,90 @@ def cmd_run_show(args) -> int:
     return 0
 
 
-def cmd_run_delete(args) -> int:
-    db = ExperimentDB(args.db)
-    db.init()
+def cmd_run_delete(db, args) -> int:
+    db.ensure_schema()
     ok = db.delete_run(args.run)
     print("[OK] deleted" if ok else "[ERR] run not found")
     return 0 if ok else 2
 
 
-def cmd_metric_log(args) -> int:
-    db = ExperimentDB(args.db)
-    db.init()
-    if not db.get_run(args.run):
+def cmd_metric_log(db, args) -> int:
+    import sqlite3
+
+    db.ensure_schema()
+    # No pre-check query: the metrics.run_id foreign key rejects unknown
+    # runs, so a bad run id surfaces as an IntegrityError on the insert.
+    try:
+        mid = db.log_metric(args.run, args.name, args.step, args.value)
+    except sqlite3.IntegrityError:
         print("[ERR] Run not found")
         return 2
-    mid = db.log_metric(args.run, args.name, args.step, args.value)
     print(f"[OK] metric_id={mid} run={args.run} {args.name}@{args.step}={args.value}")
     return 0
 
 
-def cmd_metric_export(args) -> int:
-    db = ExperimentDB(args.db)
-    db.init()
-    series = db.get_metric_series(args.run, args.name)
-    if not series:
+def cmd_metric_log_batch(db, args) -> int:
+    import json
+
+    db.ensure_schema()
+    if not db.get_run(args.run):
+        print("[ERR] Run not found")
+        return 2
+
+    def points(f):
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            obj = json.loads(line)
+            yield obj["name"], obj["step"], obj["value"]
+
+    with open(args.file, "r", encoding="utf-8") as f:
+        n = db.log_metrics_many(args.run, points(f))
+    print(f"[OK] logged {n} points to run={args.run}")
+    return 0
+
+
+def cmd_metric_import(db, args) -> int:
+    import sqlite3
+
+    db.ensure_schema()
+    try:
+        n = db.import_csv(args.run, args.name, args.file)
+    except sqlite3.IntegrityError:
+        print("[ERR] Run not found")
+        return 2
+    print(f"[OK] imported {n} points to run={args.run} metric={args.name}")
+    return 0
+
+
+def cmd_metric_export(db, args) -> int:
+    from exptrack.metrics import export_series_to_csv
+
+    from itertools import chain
+
+    db.ensure_schema()
+    series = db.iter_metric_series(args.run, args.name)
+    first = next(iter(series), None)
+    if first is None:
         print("[ERR] No data for that metric.")
         return 2
-    export_series_to_csv(series, args.out)
+    export_series_to_csv(chain([first], series), args.out)
     print(f"[OK] Exported to {args.out}")
     return 0
 
 
-def cmd_metric_plot(args) -> int:
-    db = ExperimentDB(args.db)
-    db.init()
+def cmd_metric_plot(db, args) -> int:
+    from exptrack.metrics import simple_moving_average
+
+    db.ensure_schema()
     series = db.get_metric_series(args.run, args.name)
     if not series:
         print("[ERR] No data for that metric.")
         return 2
 
     try:
-        import matplotlib.pyplot as plt
+        from exptrack.plot import plot_series
     except Exception:
         print("[ERR] matplotlib not installed. Install: pip install matplotlib")
         return 2
@@ -104,84 +144,140 @@ def cmd_metric_plot(args) -> int:
     else:
         series_s = series
 
-    xs = [s for s, _ in series_s]
-    ys = [v for _, v in series_s]
-
-    plt.figure()
-    plt.plot(xs, ys)
-    plt.title(f"run={args.run} metric={args.name}")
-    plt.xlabel("step")
-    plt.ylabel("value")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.show()
+    plot_series(series_s, title=f"run={args.run} metric={args.name}")
     return 0
 
 
-def build_parser() -> argparse.ArgumentParser:
-    p = argparse.ArgumentParser(prog="exptrack", description="Minimal experiment tracker (SQLite)")
-    p.add_argument("--db", default="exptrack.db", help="Path to SQLite DB file")
+def _run_create_args(p) -> None:
+    p.add_argument("--name", required=True)
+    p.add_argument("--tags", default="")
+    p.add_argument("--notes", default="")
+    p.add_argument("--config", default="{}", help="JSON string with config (e.g. '{\"epochs\":100}')")
 
-    sub = p.add_subparsers(dest="cmd", required=True)
 
-    # init
-    sp = sub.add_parser("init", help="Initialize database")
-    sp.set_defaults(fn=cmd_init)
+def _run_list_args(p) -> None:
+    p.add_argument("--limit", type=int, default=50)
 
-    # run
-    runp = sub.add_parser("run", help="Run operations")
-    runsub = runp.add_subparsers(dest="run_cmd", required=True)
 
-    sp = runsub.add_parser("create", help="Create a new run")
-    sp.add_argument("--name", required=True)
-    sp.add_argument("--tags", default="")
-    sp.add_argument("--notes", default="")
-    sp.add_argument("--config", default="{}", help="JSON string with config (e.g. '{\"epochs\":100}')")
-    sp.set_defaults(fn=cmd_run_create)
+def _run_id_arg(p) -> None:
+    p.add_argument("--run", type=int, required=True)
 
-    sp = runsub.add_parser("list", help="List runs")
-    sp.add_argument("--limit", type=int, default=50)
-    sp.set_defaults(fn=cmd_run_list)
 
-    sp = runsub.add_parser("show", help="Show run details")
-    sp.add_argument("--run", type=int, required=True)
-    sp.set_defaults(fn=cmd_run_show)
+def _metric_log_args(p) -> None:
+    _run_id_arg(p)
+    p.add_argument("--name", required=True)
+    p.add_argument("--step", type=int, required=True)
+    p.add_argument("--value", type=float, required=True)
 
-    sp = runsub.add_parser("delete", help="Delete a run")
-    sp.add_argument("--run", type=int, required=True)
-    sp.set_defaults(fn=cmd_run_delete)
 
-    # metric
-    mp = sub.add_parser("metric", help="Metric operations")
-    msub = mp.add_subparsers(dest="metric_cmd", required=True)
+def _metric_log_batch_args(p) -> None:
+    _run_id_arg(p)
+    p.add_argument("--file", required=True, help="JSONL file with {\"name\":..., \"step\":..., \"value\":...} per line")
 
-    sp = msub.add_parser("log", help="Log a metric point")
-    sp.add_argument("--run", type=int, required=True)
-    sp.add_argument("--name", required=True)
-    sp.add_argument("--step", type=int, required=True)
-    sp.add_argument("--value", type=float, required=True)
-    sp.set_defaults(fn=cmd_metric_log)
 
-    sp = msub.add_parser("export", help="Export a metric series to CSV")
-    sp.add_argument("--run", type=int, required=True)
-    sp.add_argument("--name", required=True)
-    sp.add_argument("--out", required=True)
-    sp.set_defaults(fn=cmd_metric_export)
+def _metric_import_args(p) -> None:
+    _run_id_arg(p)
+    p.add_argument("--name", required=True)
+    p.add_argument("--file", required=True)
 
-    sp = msub.add_parser("plot", help="Plot a metric series")
-    sp.add_argument("--run", type=int, required=True)
-    sp.add_argument("--name", required=True)
-    sp.add_argument("--sma", type=int, default=1, help="Simple moving average window")
-    sp.set_defaults(fn=cmd_metric_plot)
 
-    return p
+def _metric_export_args(p) -> None:
+    _run_id_arg(p)
+    p.add_argument("--name", required=True)
+    p.add_argument("--out", required=True)
+
+
+def _metric_plot_args(p) -> None:
+    _run_id_arg(p)
+    p.add_argument("--name", required=True)
+    p.add_argument("--sma", type=int, default=1, help="Simple moving average window")
+
+
+# Flat dispatch table mapping command words to (handler, arg builder, help).
+# Only the chosen command's parser is ever built, instead of the full
+# nested subparser tree argparse would construct on every invocation.
+COMMANDS = {
+    ("init",): (cmd_init, None, "Initialize database"),
+    ("run", "create"): (cmd_run_create, _run_create_args, "Create a new run"),
+    ("run", "list"): (cmd_run_list, _run_list_args, "List runs"),
+    ("run", "show"): (cmd_run_show, _run_id_arg, "Show run details"),
+    ("run", "delete"): (cmd_run_delete, _run_id_arg, "Delete a run"),
+    ("metric", "log"): (cmd_metric_log, _metric_log_args, "Log a metric point"),
+    ("metric", "log-batch"): (cmd_metric_log_batch, _metric_log_batch_args, "Log many metric points from a JSONL file"),
+    ("metric", "import"): (cmd_metric_import, _metric_import_args, "Import a metric series from a step,value CSV"),
+    ("metric", "export"): (cmd_metric_export, _metric_export_args, "Export a metric series to CSV"),
+    ("metric", "plot"): (cmd_metric_plot, _metric_plot_args, "Plot a metric series"),
+}
+
+
+def _print_usage(file=None) -> None:
+    file = file if file is not None else sys.stdout
+    print("usage: exptrack [--db PATH] <command> [options]", file=file)
+    print(file=file)
+    print("Minimal experiment tracker (SQLite)", file=file)
+    print(file=file)
+    print("commands:", file=file)
+    for words, (_, _, help_text) in COMMANDS.items():
+        print(f"  {' '.join(words):<18} {help_text}", file=file)
+    print(file=file)
+    print("options:", file=file)
+    print("  --db PATH          Path to SQLite DB file (default: exptrack.db)", file=file)
 
 
 def main(argv=None) -> int:
-    argv = argv if argv is not None else sys.argv[1:]
-    p = build_parser()
-    args = p.parse_args(argv)
-    return args.fn(args)
+    argv = list(argv) if argv is not None else sys.argv[1:]
+
+    # Peel off --db and the command words by hand; everything else is left
+    # for the per-command parser.
+    db_path = "exptrack.db"
+    words: list[str] = []
+    rest: list[str] = []
+    i = 0
+    while i < len(argv):
+        tok = argv[i]
+        if not words:
+            if tok in ("-h", "--help"):
+                _print_usage()
+                return 0
+            if tok == "--db":
+                if i + 1 >= len(argv):
+                    print("exptrack: error: argument --db: expected one argument", file=sys.stderr)
+                    return 2
+                db_path = argv[i + 1]
+                i += 2
+                continue
+            if tok.startswith("--db="):
+                db_path = tok[len("--db="):]
+                i += 1
+                continue
+        if not tok.startswith("-") and len(words) < 2 and tuple(words) not in COMMANDS:
+            words.append(tok)
+            i += 1
+            continue
+        rest.append(tok)
+        i += 1
+
+    key = tuple(words)
+    if key not in COMMANDS:
+        _print_usage(sys.stderr)
+        return 2
+    fn, add_args, help_text = COMMANDS[key]
+
+    import argparse
+
+    p = argparse.ArgumentParser(prog="exptrack " + " ".join(key), description=help_text)
+    p.add_argument("--db", default=db_path, help="Path to SQLite DB file")
+    if add_args is not None:
+        add_args(p)
+    args = p.parse_args(rest)
+
+    from exptrack.db import ExperimentDB
+
+    db = ExperimentDB(args.db)
+    try:
+        return fn(db, args)
+    finally:
+        db.close()
 
 
 if __name__ == "__main__":
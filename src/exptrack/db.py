@@ -2,12 +2,15 @@ from __future__ import annotations
 
 import json
 import sqlite3
+import time
 from dataclasses import dataclass
-from datetime import datetime
+from itertools import chain
 from typing import Any, Optional, Iterable
 
 
-@dataclass
+# slots=True drops the per-instance __dict__ (~3x smaller rows when a
+# large list_runs/iter_metrics result is held in memory).
+@dataclass(slots=True)
 class Run:
     id: int
     name: str
@@ -17,7 +20,7 @@ class Run:
     config_json: str
 
 
-@dataclass
+@dataclass(slots=True)
 class MetricPoint:
     id: int
     run_id: int
@@ -47,28 +50,115 @@ CREATE TABLE IF NOT EXISTS metrics (
     FOREIGN KEY (run_id) REFERENCES runs(id) ON DELETE CASCADE
 );
 
-CREATE INDEX IF NOT EXISTS idx_metrics_run_name_step
-ON metrics(run_id, name, step);
+DROP INDEX IF EXISTS idx_metrics_run_name_step;
+
+-- Covering index: appending value lets SELECT step, value ... ORDER BY step
+-- be answered entirely from the index, in order, with no table probes.
+CREATE INDEX IF NOT EXISTS idx_metrics_cover
+ON metrics(run_id, name, step, value);
 """
 
 
+# Hottest statements are bound to module-level constants so the sqlite3
+# statement cache gets an identical string (same object) on every call.
+SQL_INSERT_RUN = "INSERT INTO runs(name, created_at, tags, notes, config_json) VALUES (?, ?, ?, ?, ?)"
+SQL_INSERT_METRIC = "INSERT INTO metrics(run_id, name, step, value, created_at) VALUES (?, ?, ?, ?, ?)"
+SQL_SELECT_RUN = "SELECT id, name, created_at, tags, notes, config_json FROM runs WHERE id = ?"
+SQL_SELECT_SERIES = "SELECT step, value FROM metrics WHERE run_id = ? AND name = ? ORDER BY step ASC"
+SQL_SELECT_RUNS = "SELECT id, name, created_at, tags, notes, config_json FROM runs ORDER BY id DESC LIMIT ?"
+SQL_DELETE_RUN = "DELETE FROM runs WHERE id = ?"
+SQL_SELECT_METRIC_NAMES = "SELECT DISTINCT name FROM metrics WHERE run_id = ? ORDER BY name ASC"
+SQL_SELECT_METRICS = "SELECT id, run_id, name, step, value, created_at FROM metrics WHERE run_id = ? ORDER BY name, step"
+
+
 def now_iso() -> str:
-    return datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+    # time.strftime over gmtime skips the datetime object allocation that
+    # datetime.utcnow().isoformat() pays on every insert.
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
 
 
 class ExperimentDB:
     def __init__(self, path: str):
         self.path = path
+        self._rw_conn: Optional[sqlite3.Connection] = None
+        self._ro_conn: Optional[sqlite3.Connection] = None
 
     def connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.path)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON;")
-        return conn
+        """Return the shared read-write connection, opening it on first use.
+
+        Opening a SQLite handle (and re-running PRAGMAs) per call dominates
+        runtime for tight logging loops, so the connection is cached for the
+        lifetime of the ExperimentDB and the PRAGMAs are applied once.
+
+        With the database in WAL mode (set once by init()),
+        synchronous=NORMAL only fsyncs on WAL checkpoints: a power loss can
+        drop the last few committed transactions but cannot corrupt the
+        database, which is the right trade-off for metric logging.
+        """
+        if self._rw_conn is None:
+            # isolation_level=None puts the connection in autocommit mode:
+            # single statements commit themselves and batches use explicit
+            # BEGIN...COMMIT. cached_statements keeps the hot queries prepared.
+            # Plain tuples: sqlite3.Row costs a dict-style lookup per field
+            # and Run(**dict(row)) two extra allocations per row.
+            conn = sqlite3.connect(self.path, cached_statements=256, isolation_level=None)
+            conn.execute("PRAGMA foreign_keys = ON;")
+            conn.execute("PRAGMA synchronous = NORMAL;")
+            conn.execute("PRAGMA temp_store = MEMORY;")
+            conn.execute("PRAGMA mmap_size = 268435456;")
+            conn.execute("PRAGMA cache_size = -64000;")
+            conn.execute("PRAGMA busy_timeout = 5000;")
+            self._rw_conn = conn
+        return self._rw_conn
+
+    def connect_ro(self) -> sqlite3.Connection:
+        """Return the shared read-only connection for query paths.
+
+        Under WAL a reader on its own connection never blocks (or is
+        blocked by) the writer, so SELECTs go through this handle while
+        writes keep the read-write one. Falls back to the read-write
+        connection when the database file does not exist yet.
+        """
+        if self._ro_conn is None:
+            try:
+                conn = sqlite3.connect(
+                    f"file:{self.path}?mode=ro", uri=True, cached_statements=256
+                )
+            except sqlite3.OperationalError:
+                return self.connect()
+            conn.execute("PRAGMA mmap_size = 268435456;")
+            conn.execute("PRAGMA cache_size = -64000;")
+            conn.execute("PRAGMA busy_timeout = 5000;")
+            self._ro_conn = conn
+        return self._ro_conn
+
+    def close(self) -> None:
+        if self._ro_conn is not None:
+            self._ro_conn.close()
+            self._ro_conn = None
+        if self._rw_conn is not None:
+            self._rw_conn.close()
+            self._rw_conn = None
 
     def init(self) -> None:
-        with self.connect() as conn:
-            conn.executescript(SCHEMA_SQL)
+        conn = self.connect()
+        # WAL mode is persistent (stored in the db file), so flip it once
+        # here rather than on every connect.
+        conn.execute("PRAGMA journal_mode = WAL;")
+        conn.executescript(SCHEMA_SQL)
+
+    def ensure_schema(self) -> None:
+        """Run init() only if the schema is missing.
+
+        A single sqlite_master probe is far cheaper than re-parsing and
+        re-committing the whole CREATE IF NOT EXISTS script on every CLI
+        invocation.
+        """
+        row = self.connect().execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'runs'"
+        ).fetchone()
+        if row is None:
+            self.init()
 
     # ----------------
     # Runs
@@ -82,66 +172,98 @@ class ExperimentDB:
     ) -> int:
         config = config or {}
         config_json = json.dumps(config, ensure_ascii=False)
-        with self.connect() as conn:
-            cur = conn.execute(
-                "INSERT INTO runs(name, created_at, tags, notes, config_json) VALUES (?, ?, ?, ?, ?)",
-                (name, now_iso(), tags, notes, config_json),
-            )
-            return int(cur.lastrowid)
+        conn = self.connect()
+        cur = conn.execute(SQL_INSERT_RUN, (name, now_iso(), tags, notes, config_json))
+        return int(cur.lastrowid)
 
     def list_runs(self, limit: int = 50) -> list[Run]:
-        with self.connect() as conn:
-            rows = conn.execute(
-                "SELECT id, name, created_at, tags, notes, config_json FROM runs ORDER BY id DESC LIMIT ?",
-                (limit,),
-            ).fetchall()
-        return [Run(**dict(r)) for r in rows]
+        rows = self.connect_ro().execute(SQL_SELECT_RUNS, (limit,)).fetchall()
+        return [Run(*r) for r in rows]
 
     def get_run(self, run_id: int) -> Optional[Run]:
-        with self.connect() as conn:
-            row = conn.execute(
-                "SELECT id, name, created_at, tags, notes, config_json FROM runs WHERE id = ?",
-                (run_id,),
-            ).fetchone()
-        return Run(**dict(row)) if row else None
+        row = self.connect_ro().execute(SQL_SELECT_RUN, (run_id,)).fetchone()
+        return Run(*row) if row else None
 
     def delete_run(self, run_id: int) -> bool:
-        with self.connect() as conn:
-            cur = conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
-            return cur.rowcount > 0
+        conn = self.connect()
+        cur = conn.execute(SQL_DELETE_RUN, (run_id,))
+        return cur.rowcount > 0
 
     # ----------------
     # Metrics
     # ----------------
     def log_metric(self, run_id: int, name: str, step: int, value: float) -> int:
-        with self.connect() as conn:
-            cur = conn.execute(
-                "INSERT INTO metrics(run_id, name, step, value, created_at) VALUES (?, ?, ?, ?, ?)",
-                (run_id, name, int(step), float(value), now_iso()),
-            )
-            return int(cur.lastrowid)
+        conn = self.connect()
+        cur = conn.execute(SQL_INSERT_METRIC, (run_id, name, int(step), float(value), now_iso()))
+        return int(cur.lastrowid)
+
+    def log_metrics_many(self, run_id: int, points: Iterable[tuple[str, int, float]]) -> int:
+        """Insert many (name, step, value) points in a single transaction.
+
+        One BEGIN...COMMIT around the whole batch means one fsync instead of
+        one per row, which is the difference between hundreds and hundreds of
+        thousands of inserts per second on SQLite.
+        """
+        conn = self.connect()
+        ts = now_iso()  # one timestamp for the whole batch
+        rows = ((run_id, name, int(step), float(value), ts) for name, step, value in points)
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            cur = conn.executemany(SQL_INSERT_METRIC, rows)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return cur.rowcount
+
+    def import_csv(self, run_id: int, name: str, path: str) -> int:
+        """Bulk-load a step,value CSV (as written by export) into one metric.
+
+        Rows stream from csv.reader through a generator into the single
+        transaction of log_metrics_many, so the file is never held in
+        memory and the whole import costs one commit.
+        """
+        import csv
+
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            first = next(reader, None)
+            rows = ((name, int(s), float(v)) for s, v in reader)
+            if first is not None and first != ["step", "value"]:
+                rows = chain([(name, int(first[0]), float(first[1]))], rows)
+            return self.log_metrics_many(run_id, rows)
 
     def list_metric_names(self, run_id: int) -> list[str]:
-        with self.connect() as conn:
-            rows = conn.execute(
-                "SELECT DISTINCT name FROM metrics WHERE run_id = ? ORDER BY name ASC",
-                (run_id,),
-            ).fetchall()
-        return [r["name"] for r in rows]
+        # The covering index on (run_id, name, ...) answers the DISTINCT
+        # without touching the table; iterating the cursor skips the
+        # intermediate fetchall() list of 1-tuples.
+        cur = self.connect_ro().execute(SQL_SELECT_METRIC_NAMES, (run_id,))
+        return [name for (name,) in cur]
 
     def get_metric_series(self, run_id: int, name: str) -> list[tuple[int, float]]:
-        with self.connect() as conn:
-            rows = conn.execute(
-                "SELECT step, value FROM metrics WHERE run_id = ? AND name = ? ORDER BY step ASC",
-                (run_id, name),
-            ).fetchall()
-        return [(int(r["step"]), float(r["value"])) for r in rows]
+        # step is INTEGER and value is REAL, so sqlite3 already hands back
+        # (int, float) tuples; re-casting would just allocate n new tuples.
+        return self.connect_ro().execute(SQL_SELECT_SERIES, (run_id, name)).fetchall()
+
+    def iter_metric_series(self, run_id: int, name: str) -> Iterable[tuple[int, float]]:
+        """Yield (step, value) pairs straight from the cursor.
+
+        Unlike get_metric_series this never materializes the whole series,
+        so exporting a long run stays O(arraysize) in memory.
+        """
+        cur = self.connect_ro().execute(SQL_SELECT_SERIES, (run_id, name))
+        cur.arraysize = 1000
+        for step, value in cur:
+            yield step, value
 
     def iter_metrics(self, run_id: int) -> Iterable[MetricPoint]:
-        with self.connect() as conn:
-            rows = conn.execute(
-                "SELECT id, run_id, name, step, value, created_at FROM metrics WHERE run_id = ? ORDER BY name, step",
-                (run_id,),
-            ).fetchall()
-        for r in rows:
-            yield MetricPoint(**dict(r))
+        """Yield MetricPoints straight from the cursor.
+
+        The shared connection outlives the generator, so rows can be pulled
+        lazily in arraysize batches instead of fetchall-ing every point of
+        the run up front.
+        """
+        cur = self.connect_ro().execute(SQL_SELECT_METRICS, (run_id,))
+        cur.arraysize = 1000
+        for r in cur:
+            yield MetricPoint(*r)
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+import matplotlib.pyplot as plt
+
+
+def plot_series(series: list[tuple[int, float]], title: str = "") -> None:
+    xs = [s for s, _ in series]
+    ys = [v for _, v in series]
+
+    plt.figure()
+    plt.plot(xs, ys)
+    plt.title(title)
+    plt.xlabel("step")
+    plt.ylabel("value")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.show()